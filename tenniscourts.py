@@ -2,19 +2,22 @@ import streamlit as st
 import pandas as pd
 import os
 from datetime import datetime
-import base64
-from PIL import Image
+from PIL import Image, ImageOps
 import io
 import uuid
+import shutil
+import concurrent.futures
+import urllib.parse
 import sys
 import logging
-import numpy as np
 import pytz
 import sqlite3
+import threading
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfbase.pdfmetrics import stringWidth
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -30,90 +33,328 @@ COURTS = [
     "AR2 ROSA", "AR2 PALMA", "AR2 FITNESS FIRST"
 ]
 
+# Position of each court in COURTS, for preselecting it in the edit form
+COURT_IDX = {name: i for i, name in enumerate(COURTS)}
+
+# Directory of this script; the database and photos live here, not in the working
+# directory, and Streamlit serves static/ from here
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # Path to the SQLite database
-DATA_FILE = "issues.db"
+DATA_FILE = os.path.join(APP_DIR, "issues.db")
+
+# Columns of the issues table
+ISSUE_COLUMNS = ['id', 'date', 'court', 'problem', 'photo_path', 'reporter']
+
+# Number of issues shown per page in the issue list
+ISSUES_PER_PAGE = 25
+
+# Directory Streamlit serves at app/static/
+STATIC_DIR = os.path.join(APP_DIR, "static")
+
+# Directory for uploaded photos, under static/ so the browser can load them directly
+# (requires server.enableStaticServing in .streamlit/config.toml). Like every stored
+# photo_path it is relative to APP_DIR, so the app directory can move
+PHOTO_DIR = "static/photos"
+
+# Directory for uploads and thumbnails still being written, outside static/ so
+# partial files are never served
+UPLOAD_DIR = os.path.join(APP_DIR, "uploads")
+
+# Chunk size used when writing uploaded photos to disk
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Number of issue rows in each table of the PDF report
+PDF_ROWS_PER_TABLE = 40
+
+# Size of the thumbnails shown in the issue list
+THUMB_SIZE = (100, 100)
+
+# Directory for the JPEG thumbnails generated at upload
+THUMB_DIR = os.path.join(APP_DIR, PHOTO_DIR, "thumbs")
+
+# Function to get the absolute path of a stored photo_path, which is relative to APP_DIR
+def resolve_path(photo_path):
+    return os.path.join(APP_DIR, photo_path)
+
+# Function to open a tuned SQLite connection
+def _connect():
+    conn = sqlite3.connect(DATA_FILE, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    logger.info(f"Opened SQLite connection to {DATA_FILE}")
+    return conn
+
+# Function to get the SQLite connection, shared across reruns and sessions, with
+# the lock that every use of it must hold; sessions run on separate threads
+@st.cache_resource
+def _db():
+    return _connect(), threading.Lock()
 
 # Initialize SQLite database
 def init_db():
     try:
-        conn = sqlite3.connect(DATA_FILE)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS issues
-                     (id TEXT, date TEXT, court TEXT, problem TEXT, photo_path TEXT, reporter TEXT)''')
-        conn.commit()
+        conn, lock = _db()
+        with lock:
+            c = conn.cursor()
+            c.execute('''CREATE TABLE IF NOT EXISTS issues
+                         (id TEXT PRIMARY KEY, date TEXT, court TEXT, problem TEXT, photo_path TEXT, reporter TEXT)''')
+            # Tables created before id was the primary key get a unique index instead
+            if not any(col[5] for col in c.execute('PRAGMA table_info(issues)').fetchall()):
+                c.execute('CREATE UNIQUE INDEX IF NOT EXISTS ix_id ON issues(id)')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_issues_date ON issues(date)')
+            conn.commit()
         logger.info(f"Initialized SQLite database at {DATA_FILE}")
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
         st.error(f"Failed to initialize database: {str(e)}")
-    finally:
-        conn.close()
+
+# Function to get the modification times of the database and its WAL file
+def _db_mtimes():
+    return tuple(
+        os.path.getmtime(path) if os.path.exists(path) else None
+        for path in (DATA_FILE, DATA_FILE + "-wal")
+    )
+
+# Function to read all issues, cached across sessions until the database changes
+@st.cache_data(show_spinner=False, max_entries=1)
+def _load_by_mtime(db_mtime, wal_mtime):
+    conn, lock = _db()
+    with lock:
+        rows = conn.execute(f"SELECT {', '.join(ISSUE_COLUMNS)} FROM issues").fetchall()
+    return [dict(zip(ISSUE_COLUMNS, row)) for row in rows]
 
 # Function to load issues from SQLite
 def load_issues():
     try:
-        conn = sqlite3.connect(DATA_FILE)
-        df = pd.read_sql_query("SELECT * FROM issues", conn)
-        df['photo_path'] = df['photo_path'].replace({np.nan: None})
-        conn.close()
-        if df.empty:
-            logger.info(f"No issues found in {DATA_FILE}, returning empty DataFrame")
+        issues = _load_by_mtime(*_db_mtimes())
+        if not issues:
+            logger.info(f"No issues found in {DATA_FILE}, returning empty list")
         else:
-            logger.info(f"Loaded {len(df)} issues from {DATA_FILE}")
-        return df
+            logger.info(f"Loaded {len(issues)} issues from {DATA_FILE}")
+        return issues
     except Exception as e:
         logger.error(f"Error loading issues from {DATA_FILE}: {str(e)}")
         st.error(f"Failed to load issues: {str(e)}")
-        return pd.DataFrame(columns=['id', 'date', 'court', 'problem', 'photo_path', 'reporter'])
+        return []
 
-# Function to save issues to SQLite
-def save_issues(df):
+# Function to insert many issues into SQLite with one prepared statement in one transaction
+def insert_issues(issues):
     try:
-        conn = sqlite3.connect(DATA_FILE)
-        df['photo_path'] = df['photo_path'].replace({np.nan: None})
-        df.to_sql('issues', conn, if_exists='replace', index=False)
-        conn.close()
-        logger.info(f"Saved {len(df)} issues to {DATA_FILE}")
+        conn, lock = _db()
+        with lock, conn:
+            conn.executemany(
+                f"INSERT INTO issues ({', '.join(ISSUE_COLUMNS)}) VALUES ({', '.join('?' * len(ISSUE_COLUMNS))})",
+                [tuple(issue[col] for col in ISSUE_COLUMNS) for issue in issues]
+            )
+        _load_by_mtime.clear()
+        logger.info(f"Inserted {len(issues)} issues into {DATA_FILE}")
     except Exception as e:
-        logger.error(f"Error saving issues to {DATA_FILE}: {str(e)}")
+        logger.error(f"Error inserting issues into {DATA_FILE}: {str(e)}")
         st.error(f"Failed to save issues: {str(e)}")
 
-# Initialize session state for storing issues
-if 'issues' not in st.session_state:
-    st.session_state.issues = load_issues()
-    logger.debug(f"Initialized session state with {len(st.session_state.issues)} issues")
+# Function to insert one issue into SQLite
+def insert_issue(issue):
+    insert_issues([issue])
+
+# Function to update fields of one issue in SQLite
+def update_issue(issue_id, fields):
+    try:
+        conn, lock = _db()
+        with lock, conn:
+            conn.execute(
+                f"UPDATE issues SET {', '.join(f'{col} = ?' for col in fields)} WHERE id = ?",
+                (*fields.values(), issue_id)
+            )
+        _load_by_mtime.clear()
+        logger.info(f"Updated issue {issue_id} in {DATA_FILE}")
+    except Exception as e:
+        logger.error(f"Error updating issue in {DATA_FILE}: {str(e)}")
+        st.error(f"Failed to update issue: {str(e)}")
+
+# Function to delete one issue from SQLite
+def delete_issue(issue_id):
+    try:
+        conn, lock = _db()
+        with lock, conn:
+            conn.execute("DELETE FROM issues WHERE id = ?", (issue_id,))
+        _load_by_mtime.clear()
+        logger.info(f"Deleted issue {issue_id} from {DATA_FILE}")
+    except Exception as e:
+        logger.error(f"Error deleting issue from {DATA_FILE}: {str(e)}")
+        st.error(f"Failed to delete issue: {str(e)}")
+
+# Initialize database
+init_db()
+
+# Initialize session state for storing issues as row dicts keyed by id
+if 'issues_by_id' not in st.session_state:
+    st.session_state.issues_by_id = {issue['id']: issue for issue in load_issues()}
+    logger.debug(f"Initialized session state with {len(st.session_state.issues_by_id)} issues")
+
+# Function to get a DataFrame of the issues in session state, rebuilt only after a change
+def _issues_df():
+    if st.session_state.get('issues_df') is None:
+        df = pd.DataFrame.from_records(list(st.session_state.issues_by_id.values()), columns=ISSUE_COLUMNS)
+        # Low-cardinality columns are stored as categories; keep any court not in COURTS
+        extra_courts = sorted(set(df['court'].dropna()) - set(COURTS))
+        df['court'] = pd.Categorical(df['court'], categories=COURTS + extra_courts)
+        df['reporter'] = df['reporter'].astype('category')
+        st.session_state.issues_df = df
+    return st.session_state.issues_df
+
+# Function to get the content hash of the issues DataFrame, recomputed only after a change
+def _issues_hash():
+    if st.session_state.get('issues_hash') is None:
+        st.session_state.issues_hash = _df_hash(_issues_df())
+    return st.session_state.issues_hash
+
+# Function to mark the issues DataFrame and its hash as stale after issues_by_id changes;
+# Excel and PDF go back to being built only on request
+def _invalidate_issues_df():
+    st.session_state.issues_df = None
+    st.session_state.issues_hash = None
+    st.session_state.excel_requested = False
+    st.session_state.pdf_requested = False
+
+# Function to get the path of the thumbnail stored for a photo
+def get_thumbnail_path(photo_path):
+    return os.path.join(THUMB_DIR, os.path.basename(photo_path) + ".jpg")
+
+# Function to write the thumbnail for a photo to disk; source_path is read
+# instead of photo_path while the photo is still being processed
+def write_thumbnail(photo_path, size=THUMB_SIZE, source_path=None):
+    with Image.open(source_path or resolve_path(photo_path)) as img:
+        # Bilinear is plenty for a 100px preview and much cheaper than the default Lanczos
+        img.thumbnail(size, Image.Resampling.BILINEAR)
+        buffered = io.BytesIO()
+        img.convert("RGB").save(buffered, format="JPEG", quality=80, optimize=True)
+    thumbnail = buffered.getvalue()
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    # Write through a temporary file of its own so a concurrent reader never sees
+    # a partial thumbnail and concurrent writers never share a temporary name
+    thumb_path = get_thumbnail_path(photo_path)
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    part_path = os.path.join(UPLOAD_DIR, f"{os.path.basename(thumb_path)}.{uuid.uuid4().hex}.part")
+    with open(part_path, "wb") as f:
+        f.write(thumbnail)
+    os.replace(part_path, thumb_path)
+    logger.info(f"Saved thumbnail for {photo_path}")
+    return thumbnail
+
+# Function to get the thread pool that processes uploaded photos, shared across reruns
+@st.cache_resource
+def _photo_pool():
+    return concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
+# Function to get the photo processing futures still running, keyed by final photo path
+@st.cache_resource
+def _pending_photos():
+    return {}
+
+# Function to re-encode an uploaded photo and write its thumbnail; runs on the photo pool
+def _process_photo(upload_path, photo_path):
+    try:
+        # Store a progressive JPEG instead of the original PNG or full-quality JPEG
+        part_path = f"{upload_path}.{uuid.uuid4().hex}.part"
+        try:
+            with Image.open(upload_path) as img:
+                ImageOps.exif_transpose(img).convert("RGB").save(
+                    part_path, format="JPEG", quality=85, progressive=True, optimize=True
+                )
+            os.remove(upload_path)
+        except Exception as e:
+            logger.error(f"Error re-encoding photo {upload_path}, keeping original: {str(e)}")
+            os.replace(upload_path, part_path)
+        # Generate the thumbnail once at upload instead of on every display. It is
+        # written before the photo gets its final name, so the issue list never
+        # sees the photo without its thumbnail and never generates one itself
+        try:
+            write_thumbnail(photo_path, source_path=part_path)
+        except Exception as e:
+            logger.error(f"Error generating thumbnail for {photo_path}: {str(e)}")
+        os.replace(part_path, resolve_path(photo_path))
+        logger.info(f"Saved photo to {photo_path}")
+    except Exception as e:
+        logger.error(f"Error processing photo {photo_path}: {str(e)}")
 
 # Function to save uploaded photo
 def save_photo(uploaded_file):
     if uploaded_file is not None:
         try:
             photo_id = str(uuid.uuid4())
-            photo_path = f"photos/{photo_id}_{uploaded_file.name}"
-            os.makedirs("photos", exist_ok=True)
-            with open(photo_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            logger.info(f"Saved photo to {photo_path}")
-            return photo_path
+            upload_path = os.path.join(UPLOAD_DIR, f"{photo_id}_{uploaded_file.name}.tmp")
+            photo_path = f"{PHOTO_DIR}/{photo_id}_{os.path.splitext(uploaded_file.name)[0]}.jpg"
+            os.makedirs(UPLOAD_DIR, exist_ok=True)
+            os.makedirs(resolve_path(PHOTO_DIR), exist_ok=True)
+            uploaded_file.seek(0)
+            with open(upload_path, "wb") as f:
+                shutil.copyfileobj(uploaded_file, f, UPLOAD_CHUNK_SIZE)
         except Exception as e:
             logger.error(f"Error saving photo: {str(e)}")
             st.error(f"Failed to save photo: {str(e)}")
             return None
+        # Re-encoding and thumbnailing happen in the background; the final path is already known
+        pending = _pending_photos()
+        future = _photo_pool().submit(_process_photo, upload_path, photo_path)
+        pending[photo_path] = future
+        future.add_done_callback(lambda _: pending.pop(photo_path, None))
+        return photo_path
     return None
 
+# Function to delete a photo and its thumbnail
+def delete_photo(photo_path):
+    if photo_path and isinstance(photo_path, str):
+        # Let a still-running upload finish first, or it would write the files after they were deleted
+        future = _pending_photos().get(photo_path)
+        if future is not None:
+            concurrent.futures.wait([future])
+        for path in (resolve_path(photo_path), get_thumbnail_path(photo_path)):
+            try:
+                os.remove(path)
+                logger.info(f"Deleted photo {path}")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error deleting photo {path}: {str(e)}")
+
+# Function to read a thumbnail, memoized across reruns by path and size.
+# Photo paths start with a fresh uuid and are never rewritten, so the path
+# alone identifies the image and no stat is needed on a cache hit
+@st.cache_data(show_spinner=False, max_entries=512)
+def _thumb_cached(photo_path, size):
+    thumb_path = get_thumbnail_path(photo_path)
+    # Photos saved before thumbnails were pre-generated get theirs on first display
+    if os.path.exists(thumb_path) and os.path.getmtime(thumb_path) >= os.path.getmtime(resolve_path(photo_path)):
+        with open(thumb_path, "rb") as f:
+            return f.read()
+    return write_thumbnail(photo_path, size)
+
 # Function to get thumbnail
-def get_thumbnail(photo_path, size=(100, 100)):
-    if photo_path and isinstance(photo_path, str) and os.path.exists(photo_path):
+def get_thumbnail(photo_path, size=THUMB_SIZE):
+    if photo_path and isinstance(photo_path, str) and os.path.exists(resolve_path(photo_path)):
         try:
-            img = Image.open(photo_path)
-            img.thumbnail(size)
-            buffered = io.BytesIO()
-            img.save(buffered, format="PNG")
-            return base64.b64encode(buffered.getvalue()).decode()
+            return _thumb_cached(photo_path, size)
         except Exception as e:
             logger.error(f"Error generating thumbnail for {photo_path}: {str(e)}")
             return None
     logger.debug(f"No thumbnail generated for {photo_path}: invalid path or file does not exist")
     return None
 
+# Function to get the URL of a photo served by Streamlit's static file server,
+# or None for photos stored outside static/
+def get_photo_url(photo_path):
+    if not isinstance(photo_path, str):
+        return None
+    abs_path = os.path.abspath(resolve_path(photo_path))
+    if abs_path.startswith(STATIC_DIR + os.sep):
+        static_path = os.path.relpath(abs_path, STATIC_DIR).replace(os.sep, "/")
+        return "app/static/" + urllib.parse.quote(static_path)
+    return None
+
 # Function to generate PDF from issues
 def generate_pdf(issues_df):
     buffer = io.BytesIO()
@@ -127,19 +368,33 @@ def generate_pdf(issues_df):
     
     # Table data
     data = [['ID', 'Date', 'Court', 'Problem', 'Photo Path', 'Reporter']]
-    for _, row in issues_df.iterrows():
-        data.append([
-            row['id'][:8] + '...' if isinstance(row['id'], str) else '',
-            row['date'],
-            row['court'],
-            row['problem'][:50] + '...' if isinstance(row['problem'], str) and len(row['problem']) > 50 else row['problem'],
-            row['photo_path'] if row['photo_path'] else 'None',
-            row['reporter']
-        ])
+    problems = issues_df['problem']
+    photo_paths = issues_df['photo_path']
+    out_df = pd.DataFrame({
+        'id': issues_df['id'].str.slice(0, 8).add('...').fillna(''),
+        'date': issues_df['date'],
+        'court': issues_df['court'].astype(object),
+        'problem': problems.where(~problems.str.len().gt(50), problems.str.slice(0, 50) + '...'),
+        'photo_path': photo_paths.where(photo_paths.notna() & photo_paths.ne(''), 'None'),
+        'reporter': issues_df['reporter'].astype(object)
+    })
+    data.extend(out_df.to_numpy().tolist())
     
-    # Create table
-    table = Table(data)
-    table.setStyle(TableStyle([
+    # Size the columns once for the whole report, the same way reportlab would
+    # (widest line of any cell plus 6pt padding on each side), so every sub-table lines up
+    col_widths = [
+        max(
+            stringWidth(str(header), 'Helvetica-Bold', 12),
+            max((
+                stringWidth(line, 'Helvetica', 10)
+                for cell in column for line in str(cell).split('\n')
+            ), default=0)
+        ) + 12
+        for header, *column in zip(*data)
+    ]
+
+    # Create tables of fixed size; one long table is re-split page after page
+    table_style = TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
@@ -148,20 +403,156 @@ def generate_pdf(issues_df):
         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
         ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
         ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(table)
+    ])
+    header, rows = data[0], data[1:]
+    for start in range(0, max(len(rows), 1), PDF_ROWS_PER_TABLE):
+        table = Table([header] + rows[start:start + PDF_ROWS_PER_TABLE], colWidths=col_widths, repeatRows=1)
+        table.setStyle(table_style)
+        elements.append(table)
     
     # Build PDF
     doc.build(elements)
-    buffer.seek(0)
-    return buffer
+    return buffer.getvalue()
+
+# Function to hash the issues DataFrame, used as the cache key for downloads
+def _df_hash(df):
+    return int(pd.util.hash_pandas_object(df, index=False).sum())
+
+# Functions to build download bytes, cached until the issues change
+@st.cache_data(show_spinner=False, max_entries=8)
+def _csv_bytes(df_hash, _df):
+    return _df.to_csv(index=False).encode('utf-8')
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _excel_bytes(df_hash, _df):
+    excel_buffer = io.BytesIO()
+    _df.to_excel(excel_buffer, index=False, engine='openpyxl')
+    return excel_buffer.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _pdf_bytes(df_hash, _df):
+    return generate_pdf(_df)
+
+# Function to delete an issue; runs as a button callback in the row fragment and
+# sets flash so the fragment reruns the whole page without the issue
+def delete_issue_callback(issue_id, photo_path):
+    # Remove photo and thumbnail files if they exist
+    delete_photo(photo_path)
+    # Remove issue from session state
+    st.session_state.issues_by_id.pop(issue_id, None)
+    _invalidate_issues_df()
+    st.session_state.pop(f"edit_mode_{issue_id}", None)
+    delete_issue(issue_id)  # Save to SQLite
+    st.session_state.flash = None
+    logger.debug(f"Deleted issue, total issues: {len(st.session_state.issues_by_id)}")
+
+# Function to save the edit form of an issue; runs as a form callback in the row
+# fragment and sets flash so the fragment reruns the whole page with the result
+def save_edit_callback(issue_id, photo_path):
+    edit_court = st.session_state[f"edit_court_{issue_id}"]
+    edit_problem = st.session_state[f"edit_problem_{issue_id}"]
+    edit_photo = st.session_state[f"edit_photo_{issue_id}"]
+    edit_reporter = st.session_state[f"edit_reporter_{issue_id}"]
+    if edit_court and edit_problem and edit_reporter:
+        # Handle photo update
+        new_photo_path = save_photo(edit_photo) if edit_photo else photo_path
+        if edit_photo:
+            delete_photo(photo_path)
+
+        # Update the issue in session state
+        changes = {
+            'date': datetime.now(pytz.timezone('Asia/Dubai')).strftime("%Y-%m-%d %H:%M:%S"),
+            'court': edit_court,
+            'problem': edit_problem,
+            'photo_path': new_photo_path,
+            'reporter': edit_reporter
+        }
+        st.session_state.issues_by_id[issue_id].update(changes)
+        _invalidate_issues_df()
+        update_issue(issue_id, changes)  # Save to SQLite
+        st.session_state[f"edit_mode_{issue_id}"] = False
+        logger.debug(f"Updated issue, total issues: {len(st.session_state.issues_by_id)}")
+        st.session_state.flash = ("success", "Issue updated successfully!")
+    else:
+        st.session_state.flash = ("error", "Please fill in all required fields (Court, Problem, Name)")
+
+# Function to render the photo of an issue
+def render_photo(issue_id, issue_photo):
+    thumbnail = get_thumbnail(issue_photo)
+    if thumbnail:
+        st.image(
+            thumbnail,
+            caption="Click to view full size",
+            use_container_width=True
+        )
+        if st.button("View Full Size", key=f"view_{issue_id}"):
+            # Let the browser fetch and scale the photo instead of decoding it in Python
+            photo_url = get_photo_url(issue_photo)
+            if photo_url:
+                st.markdown(f'<img src="{photo_url}" style="max-width:100%">', unsafe_allow_html=True)
+            else:
+                st.image(resolve_path(issue_photo), use_container_width=True)
+
+# Function to render one issue row. It runs as a fragment, so Edit and View Full
+# Size rerun only this row; after Save Changes or Delete the callback has set
+# flash, and the whole page is rerun once to show the message and the new list
+@st.fragment
+def render_issue(issue_id, issue_date, issue_court, issue_problem, issue_photo, issue_reporter):
+    if 'flash' in st.session_state:
+        st.rerun(scope="app")
+
+    col1, col2, col3, col4, col5 = st.columns([2, 2, 3, 2, 1])
+
+    with col1:
+        st.write(issue_date)
+
+    with col2:
+        st.write(issue_court)
+
+    with col3:
+        st.write(issue_problem)
+
+    with col4:
+        render_photo(issue_id, issue_photo)
+
+    with col5:
+        st.write(issue_reporter)
+        col5_1, col5_2 = st.columns(2)
+        with col5_1:
+            if st.button("Edit", key=f"edit_{issue_id}"):
+                st.session_state[f"edit_mode_{issue_id}"] = True
+        with col5_2:
+            st.button("Delete", key=f"delete_{issue_id}", on_click=delete_issue_callback, args=(issue_id, issue_photo))
+
+    # Edit form in an expander
+    if st.session_state.get(f"edit_mode_{issue_id}", False):
+        with st.expander("Edit Issue", expanded=True):
+            with st.form(f"edit_form_{issue_id}"):
+                # Keep a court no longer in COURTS selectable so saving does not silently change it
+                if issue_court in COURT_IDX or not isinstance(issue_court, str):
+                    court_options, court_index = COURTS, COURT_IDX.get(issue_court, 0)
+                else:
+                    court_options, court_index = COURTS + [issue_court], len(COURTS)
+                st.selectbox("Court Name", court_options, index=court_index, key=f"edit_court_{issue_id}")
+                st.text_area("Problem Description", value=issue_problem, key=f"edit_problem_{issue_id}")
+                st.file_uploader("Upload New Photo (optional)", type=['png', 'jpg', 'jpeg'], key=f"edit_photo_{issue_id}")
+                st.text_input("Your Name", value=issue_reporter, key=f"edit_reporter_{issue_id}")
+                st.form_submit_button("Save Changes", on_click=save_edit_callback, args=(issue_id, issue_photo))
+
+    st.markdown("---")
 
 # Main app function
 def main():
     st.title("Tennis Court Issue Tracker")
 
-    # Initialize database
-    init_db()
+    # Show the message left by an edit or delete callback, once
+    flash = st.session_state.pop('flash', None)
+    if flash:
+        level, message = flash
+        if level == "success":
+            st.success(message)
+        else:
+            st.error(message)
 
     # Dubai timezone
     dubai_tz = pytz.timezone('Asia/Dubai')
@@ -178,29 +569,32 @@ def main():
         if submit_button:
             if court and problem and reporter:
                 photo_path = save_photo(photo)
-                new_issue = pd.DataFrame({
-                    'id': [str(uuid.uuid4())],
-                    'date': [datetime.now(dubai_tz).strftime("%Y-%m-%d %H:%M:%S")],
-                    'court': [court],
-                    'problem': [problem],
-                    'photo_path': [photo_path],
-                    'reporter': [reporter]
-                })
-                st.session_state.issues = pd.concat(
-                    [st.session_state.issues, new_issue], 
-                    ignore_index=True
-                )
-                save_issues(st.session_state.issues)  # Save to SQLite
-                logger.debug(f"Added new issue, total issues: {len(st.session_state.issues)}")
+                new_issue = {
+                    'id': str(uuid.uuid4()),
+                    'date': datetime.now(dubai_tz).strftime("%Y-%m-%d %H:%M:%S"),
+                    'court': court,
+                    'problem': problem,
+                    'photo_path': photo_path,
+                    'reporter': reporter
+                }
+                st.session_state.issues_by_id[new_issue['id']] = new_issue
+                _invalidate_issues_df()
+                insert_issue(new_issue)  # Save to SQLite
+                logger.debug(f"Added new issue, total issues: {len(st.session_state.issues_by_id)}")
                 st.success("Issue reported successfully!")
             else:
                 st.error("Please fill in all required fields (Court, Problem, Name)")
 
+    # Materialize the issues once for downloads and display
+    issues_df = _issues_df()
+
     # Download options
     st.subheader("Download Issues")
-    if not st.session_state.issues.empty:
+    if not issues_df.empty:
+        issues_hash = _issues_hash()
+
         # CSV Download
-        csv = st.session_state.issues.to_csv(index=False).encode('utf-8')
+        csv = _csv_bytes(issues_hash, issues_df)
         st.download_button(
             label="Download as CSV",
             data=csv,
@@ -209,27 +603,29 @@ def main():
             disabled=False
         )
 
-        # Excel Download
-        excel_buffer = io.BytesIO()
-        st.session_state.issues.to_excel(excel_buffer, index=False, engine='openpyxl')
-        excel_buffer.seek(0)
-        st.download_button(
-            label="Download as Excel",
-            data=excel_buffer,
-            file_name="tennis_court_issues.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            disabled=False
-        )
+        # Excel Download, only built after the user asks for it once
+        if st.session_state.get('excel_requested') or st.button("Prepare Excel"):
+            st.session_state.excel_requested = True
+            excel_data = _excel_bytes(issues_hash, issues_df)
+            st.download_button(
+                label="Download as Excel",
+                data=excel_data,
+                file_name="tennis_court_issues.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                disabled=False
+            )
 
-        # PDF Download
-        pdf_buffer = generate_pdf(st.session_state.issues)
-        st.download_button(
-            label="Download as PDF",
-            data=pdf_buffer,
-            file_name="tennis_court_issues.pdf",
-            mime="application/pdf",
-            disabled=False
-        )
+        # PDF Download, only built after the user asks for it once
+        if st.session_state.get('pdf_requested') or st.button("Prepare PDF"):
+            st.session_state.pdf_requested = True
+            pdf_data = _pdf_bytes(issues_hash, issues_df)
+            st.download_button(
+                label="Download as PDF",
+                data=pdf_data,
+                file_name="tennis_court_issues.pdf",
+                mime="application/pdf",
+                disabled=False
+            )
     else:
         st.download_button(
             label="Download as CSV",
@@ -256,94 +652,17 @@ def main():
 
     # Display reported issues
     st.subheader("Reported Issues")
-    if not st.session_state.issues.empty:
-        for idx, row in st.session_state.issues.iterrows():
-            col1, col2, col3, col4, col5 = st.columns([2, 2, 3, 2, 1])
-            
-            with col1:
-                st.write(row['date'])
-            
-            with col2:
-                st.write(row['court'])
-            
-            with col3:
-                st.write(row['problem'])
-            
-            with col4:
-                thumbnail = get_thumbnail(row['photo_path'])
-                if thumbnail:
-                    st.image(
-                        f"data:image/png;base64,{thumbnail}",
-                        caption="Click to view full size",
-                        use_container_width=True
-                    )
-                    if st.button("View Full Size", key=f"view_{row['id']}"):
-                        st.image(row['photo_path'], use_container_width=True)
-            
-            with col5:
-                st.write(row['reporter'])
-                col5_1, col5_2 = st.columns(2)
-                with col5_1:
-                    if st.button("Edit", key=f"edit_{row['id']}"):
-                        st.session_state[f"edit_mode_{row['id']}"] = True
-                with col5_2:
-                    if st.button("Delete", key=f"delete_{row['id']}"):
-                        # Remove photo file if exists
-                        if row['photo_path'] and isinstance(row['photo_path'], str) and os.path.exists(row['photo_path']):
-                            try:
-                                os.remove(row['photo_path'])
-                                logger.info(f"Deleted photo {row['photo_path']}")
-                            except Exception as e:
-                                logger.error(f"Error deleting photo {row['photo_path']}: {str(e)}")
-                        # Remove issue from dataframe
-                        st.session_state.issues = st.session_state.issues[
-                            st.session_state.issues['id'] != row['id']
-                        ]
-                        save_issues(st.session_state.issues)  # Save to SQLite
-                        logger.debug(f"Deleted issue, total issues: {len(st.session_state.issues)}")
-                        st.rerun()
-
-            # Edit form in an expander
-            if st.session_state.get(f"edit_mode_{row['id']}", False):
-                with st.expander("Edit Issue", expanded=True):
-                    with st.form(f"edit_form_{row['id']}"):
-                        edit_court = st.selectbox("Court Name", COURTS, index=COURTS.index(row['court']))
-                        edit_problem = st.text_area("Problem Description", value=row['problem'])
-                        edit_photo = st.file_uploader("Upload New Photo (optional)", type=['png', 'jpg', 'jpeg'], key=f"edit_photo_{row['id']}")
-                        edit_reporter = st.text_input("Your Name", value=row['reporter'])
-                        save_button = st.form_submit_button("Save Changes")
-
-                        if save_button:
-                            if edit_court and edit_problem and edit_reporter:
-                                # Handle photo update
-                                new_photo_path = save_photo(edit_photo) if edit_photo else row['photo_path']
-                                if edit_photo and row['photo_path'] and isinstance(row['photo_path'], str) and os.path.exists(row['photo_path']):
-                                    try:
-                                        os.remove(row['photo_path'])
-                                        logger.info(f"Deleted old photo {row['photo_path']}")
-                                    except Exception as e:
-                                        logger.error(f"Error deleting old photo {row['photo_path']}: {str(e)}")
-                                
-                                # Update the issue in the DataFrame
-                                st.session_state.issues.loc[
-                                    st.session_state.issues['id'] == row['id'],
-                                    ['date', 'court', 'problem', 'photo_path', 'reporter']
-                                ] = [
-                                    datetime.now(dubai_tz).strftime("%Y-%m-%d %H:%M:%S"),
-                                    edit_court,
-                                    edit_problem,
-                                    new_photo_path,
-                                    edit_reporter
-                                ]
-                                save_issues(st.session_state.issues)  # Save to SQLite
-                                st.session_state[f"edit_mode_{row['id']}"] = False
-                                logger.debug(f"Updated issue, total issues: {len(st.session_state.issues)}")
-                                st.success("Issue updated successfully!")
-                                st.rerun()
-                            else:
-                                st.error("Please fill in all required fields (Court, Problem, Name)")
-            
-            st.markdown("---")
+    if not issues_df.empty:
+        # Only render one page of issues, newest first
+        page_count = max(1, (len(issues_df) + ISSUES_PER_PAGE - 1) // ISSUES_PER_PAGE)
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+        page_df = issues_df.sort_values('date', ascending=False).iloc[
+            (page - 1) * ISSUES_PER_PAGE:page * ISSUES_PER_PAGE
+        ]
+        for issue_id, issue_date, issue_court, issue_problem, issue_photo, issue_reporter in zip(
+            *(page_df[col].to_numpy() for col in ISSUE_COLUMNS)
+        ):
+            render_issue(issue_id, issue_date, issue_court, issue_problem, issue_photo, issue_reporter)
     else:
         st.info("No issues reported yet.")
 